@@ -1,36 +1,84 @@
 import streamlit as st
 import osmnx as ox
 import geopandas as gpd
-from shapely.geometry import mapping
+import shapely
+from shapely.geometry import mapping, shape
 from streamlit_folium import st_folium
 import folium
 from folium.plugins import Draw
-import json
+from boundary_cache import cache_path, load_or_fetch
+from geometry_utils import clean_polygon, is_unchanged, restore_detail, snap_to_grid
+import hashlib
+import io
+import orjson
+import os
+import pyproj
+from pathlib import Path
 
-st.set_page_config(page_title="Editable OSM Boundary", layout="wide")
-st.title("🗺️ Editable OSM City Boundary")
+ZOOM_START = 10
+# Grid size in degrees (~1 m); finer OSM digits are invisible at city scale
+COORD_PRECISION = 1e-5
 
-city = st.text_input("City name", value="Bengaluru, India")
+# On-disk boundary cache, shared across sessions and restarts
+CACHE_DIR = Path(os.environ.get("BOUNDARY_CACHE_DIR", ".boundary_cache"))
 
-if st.button("Fetch Boundary"):
-    # Fetch boundary
+
+def _geocode(city):
     gdf = ox.geocode_to_gdf(city, which_result=1)
-    gdf = gdf.to_crs(4326)
+    # osmnx already returns WGS84; only reproject when it does not
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(4326)
     geom = gdf.iloc[0].geometry
+    if geom.geom_type == "GeometryCollection":
+        # Keep the largest polygonal part; iteration order often puts a sliver first
+        polys = [g for g in geom.geoms if g.geom_type in ("Polygon", "MultiPolygon")]
+        if polys:
+            geom = max(polys, key=lambda g: g.area)
+    # OSM boundaries are not always valid; snapping must not fail the fetch
+    geom = snap_to_grid(geom, COORD_PRECISION)
 
-    feature = {
+    return {
         "type": "Feature",
-        "properties": {"name": city},
+        "properties": {},
         "geometry": mapping(geom)
     }
 
-    centroid = geom.centroid
-    m = folium.Map(location=[centroid.y, centroid.x], zoom_start=10, tiles="cartodbpositron")
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def fetch_city_boundary(city):
+    path = cache_path(CACHE_DIR, city, COORD_PRECISION)
+    feature = load_or_fetch(path, lambda: _geocode(city))
+
+    # The disk cache is shared across spellings; name the feature as asked
+    feature["properties"] = {"name": city}
+    return feature
+
+
+def display_tolerance(zoom):
+    # Roughly one screen pixel (of a 4096-unit tile) in degrees at this zoom
+    return 360 / (2 ** zoom * 4096)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def build_map(feature_key, _feature_json):
+    # Keyed on a digest of the feature bytes; the bytes themselves are not hashed
+    feature = orjson.loads(_feature_json)
+    # GEOS parses the raw bytes directly, skipping shape()'s dict walk
+    geom = shapely.from_geojson(_feature_json)
+
+    # Point on the surface; cheaper than an area-weighted centroid on big multipolygons
+    center = geom.representative_point()
+    m = folium.Map(location=[center.y, center.x], zoom_start=ZOOM_START, tiles="cartodbpositron")
+
+    # Simplify for display only; full-res OSM rings bloat the Leaflet payload.
+    # Edits are mapped back onto the full geometry with restore_detail.
+    display_geom = geom.simplify(display_tolerance(ZOOM_START), preserve_topology=True)
+    display_feature = {**feature, "geometry": mapping(display_geom)}
 
     # FeatureGroup with GeoJson boundary
     fg = folium.FeatureGroup(name="editable_boundary")
     gj = folium.GeoJson(
-        feature,
+        display_feature,
         name="boundary",
         style_function=lambda x: {"fillColor": "blue", "color": "black", "weight": 2, "fillOpacity": 0.1},
     )
@@ -43,6 +91,51 @@ if st.button("Fetch Boundary"):
         edit_options={"featureGroup": fg}  # allow editing this boundary
     ).add_to(m)
 
+    return m, display_geom, geom
+
+
+def process_edit(edited, display_geom, full_geom):
+    # Leaflet echoes the untouched boundary back on click; that is not an edit
+    if is_unchanged(edited["geometry"], display_geom):
+        return None
+
+    # Leaflet edited the simplified layer; put back the detail it never saw
+    geom = restore_detail(shape(edited["geometry"]), display_geom, full_geom)
+    fixed = clean_polygon(geom)
+    if fixed is None:
+        return None
+    # Dragged vertices come back at Leaflet's 1e-6; snap like the fetched boundary
+    fixed = snap_to_grid(fixed, COORD_PRECISION)
+    # An edit collapsed to a line or sliver has nothing left to download
+    if fixed.is_empty or not fixed.is_valid:
+        return None
+    feature = {**edited, "geometry": mapping(fixed)}
+    return feature, orjson.dumps(feature)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def to_flatgeobuf(feature_json, name):
+    # Binary FlatGeobuf is much smaller than GeoJSON text for detailed boundaries;
+    # cached so pan/zoom reruns don't re-run the GDAL write
+    fgb = io.BytesIO()
+    gpd.GeoDataFrame({"name": [name]}, geometry=[shapely.from_geojson(feature_json)], crs=4326).to_file(
+        fgb, driver="FlatGeobuf", engine="pyogrio"
+    )
+    return fgb.getvalue()
+
+
+@st.cache_resource(show_spinner=False)
+def _warmup():
+    # Open the PROJ database at startup; the first fetch's crs.to_epsg() check
+    # would otherwise pay for it
+    pyproj.CRS.from_epsg(4326).to_epsg()
+
+
+@st.fragment
+def boundary_editor(feature_key, feature_json, city):
+    # Map events rerun only this fragment, not the fetch or the inputs above
+    m, display_geom, full_geom = build_map(feature_key, feature_json)
+
     st.markdown("### Drag the boundary vertices to adjust it 👇")
     output = st_folium(m, width=700, height=500, key="map1")
 
@@ -53,12 +146,48 @@ if st.button("Fetch Boundary"):
         elif output.get("all_drawings"):
             edited = output["all_drawings"][-1]
 
-    if edited:
+    # Pan/zoom reruns return the same drawing; only reprocess when it changes
+    edit_key = (feature_key, hashlib.sha1(orjson.dumps(edited)).hexdigest()) if edited else None
+    if st.session_state.get("edit_key") != edit_key:
+        st.session_state["edit_key"] = edit_key
+        st.session_state["edit_result"] = process_edit(edited, display_geom, full_geom) if edited else None
+
+    if st.session_state.get("edit_result"):
+        edited, edited_json = st.session_state["edit_result"]
+        stem = f"{city.replace(',','').replace(' ','_')}_edited"
         st.success("Edited boundary captured ✅")
         st.json(edited)
         st.download_button(
             "Download Edited GeoJSON",
-            data=json.dumps(edited),
-            file_name=f"{city.replace(',','').replace(' ','_')}_edited.geojson",
+            data=edited_json,
+            file_name=f"{stem}.geojson",
             mime="application/geo+json"
         )
+        st.download_button(
+            "Download Edited FlatGeobuf",
+            data=to_flatgeobuf(edited_json, city),
+            file_name=f"{stem}.fgb",
+            mime="application/octet-stream"
+        )
+
+
+st.set_page_config(page_title="Editable OSM Boundary", layout="wide")
+st.title("🗺️ Editable OSM City Boundary")
+_warmup()
+
+city = st.text_input("City name", value="Bengaluru, India")
+
+if st.button("Fetch Boundary"):
+    # Fetch boundary (cached on disk and in memory); serialize once and keep
+    # the bytes across reruns
+    feature_json = orjson.dumps(fetch_city_boundary(city))
+    st.session_state["feature_json"] = feature_json
+    st.session_state["feature_key"] = hashlib.sha1(feature_json).hexdigest()
+    st.session_state["feature_city"] = city
+
+if "feature_json" in st.session_state:
+    boundary_editor(
+        st.session_state["feature_key"],
+        st.session_state["feature_json"],
+        st.session_state["feature_city"],
+    )
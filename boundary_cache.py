@@ -0,0 +1,64 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import orjson
+
+# Bump when the stored feature changes shape
+CACHE_VERSION = 1
+
+
+def cache_path(cache_dir, city, precision):
+    """Cache file for city, keyed on its normalized name (case, whitespace) and grid."""
+    name = " ".join(city.lower().split())
+    key = f"v{CACHE_VERSION}|{precision!r}|{name}"
+    return Path(cache_dir) / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.geojson"
+
+
+def read_cached(path):
+    """Cached feature dict, or None on a miss. Corrupt entries are removed."""
+    try:
+        feature = orjson.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except (OSError, orjson.JSONDecodeError):
+        feature = None
+    if isinstance(feature, dict):
+        return feature
+
+    # Truncated, corrupt or not a feature: drop it so the boundary is refetched
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        pass
+    return None
+
+
+def write_cached(path, feature):
+    """Best-effort atomic write; returns False instead of raising on OSError."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(orjson.dumps(feature))
+        # Atomic, so concurrent sessions never read a partial file
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        return False
+    finally:
+        # No-op after a successful replace; removes the leftover on failure
+        Path(tmp).unlink(missing_ok=True)
+
+
+def load_or_fetch(path, fetch):
+    """Return the cached feature at path, or call fetch() and try to cache its result."""
+    feature = read_cached(path)
+    if feature is None:
+        feature = fetch()
+        write_cached(path, feature)
+    return feature
@@ -0,0 +1,129 @@
+import math
+
+import shapely
+from shapely.errors import GEOSException
+from shapely.geometry import MultiPolygon, Polygon, shape
+
+# Leaflet's toGeoJSON rounds to 6 digits, so an echo is off by up to 5e-7
+ECHO_TOLERANCE = 1e-6
+
+
+def _js_key(x, y, digits=6):
+    # Same rounding as Leaflet's formatNum (Math.round), used by toGeoJSON
+    pow_ = 10 ** digits
+    return (math.floor(x * pow_ + 0.5), math.floor(y * pow_ + 0.5))
+
+
+def _polygons(geom):
+    return list(geom.geoms) if geom.geom_type == "MultiPolygon" else [geom]
+
+
+def _rings(poly):
+    return [poly.exterior, *poly.interiors]
+
+
+def _restore_ring(edited, display, full):
+    # Coordinates without the closing point
+    e = list(edited.coords)[:-1]
+    d = list(display.coords)[:-1]
+    f = list(full.coords)[:-1]
+
+    # simplify() keeps a subset of the original vertices, in order, but may
+    # start the ring elsewhere; rotate the full ring to the same start
+    if d[0] not in f:
+        return None
+    start = f.index(d[0])
+    f = f[start:] + f[:start]
+
+    index = []
+    i = 0
+    for pt in d:
+        while i < len(f) and f[i] != pt:
+            i += 1
+        if i == len(f):
+            return None
+        index.append(i)
+
+    lookup = {}
+    for j, pt in enumerate(d):
+        lookup.setdefault(_js_key(*pt), j)
+
+    out = []
+    for k, a in enumerate(e):
+        b = e[(k + 1) % len(e)]
+        ja = lookup.get(_js_key(*a))
+        jb = lookup.get(_js_key(*b))
+        out.append(d[ja] if ja is not None else a)
+        # Both ends untouched and still neighbours: put back the dropped vertices
+        if ja is not None and jb == (ja + 1) % len(d):
+            ia, ib = index[ja], index[jb]
+            out.extend(f[ia + 1:ib] if ib > ia else f[ia + 1:])
+    return out
+
+
+def restore_detail(edited_geom, display_geom, full_geom):
+    """Reapply edits made on a simplified display geometry to the full geometry.
+
+    Vertices the user did not move are matched back to the display geometry,
+    and each untouched segment gets the original vertices simplify() dropped.
+    Moved, added or deleted vertices are kept as edited. If the ring structure
+    no longer lines up, the edited geometry is returned as is.
+    """
+    e_polys = _polygons(edited_geom)
+    d_polys = _polygons(display_geom)
+    f_polys = _polygons(full_geom)
+    if not (len(e_polys) == len(d_polys) == len(f_polys)):
+        return edited_geom
+
+    polys = []
+    for ep, dp, fp in zip(e_polys, d_polys, f_polys):
+        e_rings, d_rings, f_rings = _rings(ep), _rings(dp), _rings(fp)
+        if not (len(e_rings) == len(d_rings) == len(f_rings)):
+            return edited_geom
+        rings = [_restore_ring(*r) for r in zip(e_rings, d_rings, f_rings)]
+        if None in rings:
+            return edited_geom
+        polys.append(Polygon(rings[0], rings[1:]))
+
+    if edited_geom.geom_type == "MultiPolygon":
+        return MultiPolygon(polys)
+    return polys[0]
+
+
+def is_unchanged(geometry, display_geom, tolerance=ECHO_TOLERANCE):
+    """True if a GeoJSON geometry from the browser is just the displayed one echoed back."""
+    return bool(shapely.equals_exact(shape(geometry), display_geom, tolerance=tolerance))
+
+
+def clean_polygon(geom):
+    """Return geom as a valid Polygon/MultiPolygon, or None if nothing polygonal is left.
+
+    Dragging vertices easily produces bow-ties and overlapping lobes. The
+    "structure" method of make_valid unions overlapping parts, where the
+    default "linework" method would cut them out even-odd.
+    """
+    if geom.is_valid:
+        ok = geom.geom_type in ("Polygon", "MultiPolygon") and not geom.is_empty
+        return geom if ok else None
+    repaired = shapely.make_valid(geom, method="structure", keep_collapsed=False)
+    polys = [
+        part for part in shapely.get_parts(repaired)
+        if part.geom_type in ("Polygon", "MultiPolygon") and not part.is_empty
+    ]
+    if not polys:
+        return None
+    return polys[0] if len(polys) == 1 else shapely.union_all(polys)
+
+
+def snap_to_grid(geom, grid_size):
+    """set_precision that tolerates imperfect input.
+
+    set_precision raises on some invalid geometries (e.g. a bow-tie), so
+    repair first; if snapping still fails, keep the unsnapped geometry.
+    """
+    if not geom.is_valid:
+        geom = clean_polygon(geom) or geom
+    try:
+        return shapely.set_precision(geom, grid_size)
+    except GEOSException:
+        return geom
@@ -0,0 +1,58 @@
+from boundary_cache import cache_path, load_or_fetch, read_cached, write_cached
+
+FEATURE = {"type": "Feature", "properties": {}, "geometry": {"type": "Point", "coordinates": [77.59, 12.97]}}
+
+
+def test_cache_path_normalizes_case_and_whitespace(tmp_path):
+    assert cache_path(tmp_path, "  Bengaluru,   INDIA ", 1e-5) == cache_path(tmp_path, "bengaluru, india", 1e-5)
+
+
+def test_cache_path_depends_on_precision(tmp_path):
+    assert cache_path(tmp_path, "Bengaluru, India", 1e-5) != cache_path(tmp_path, "Bengaluru, India", 1e-6)
+
+
+def test_round_trip(tmp_path):
+    path = cache_path(tmp_path, "Bengaluru, India", 1e-5)
+
+    assert write_cached(path, FEATURE)
+    assert read_cached(path) == FEATURE
+
+
+def test_corrupt_file_is_removed_and_refetched(tmp_path):
+    path = cache_path(tmp_path, "Bengaluru, India", 1e-5)
+    path.write_bytes(b'{"type": "Feat')
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return FEATURE
+
+    assert load_or_fetch(path, fetch) == FEATURE
+    assert calls == [1]
+    assert read_cached(path) == FEATURE
+
+
+def test_non_dict_file_is_a_miss(tmp_path):
+    path = cache_path(tmp_path, "Bengaluru, India", 1e-5)
+    path.write_bytes(b"[1, 2, 3]")
+
+    assert read_cached(path) is None
+    assert not path.exists()
+
+
+def test_failed_write_leaves_no_tmp_file(tmp_path):
+    path = cache_path(tmp_path, "Bengaluru, India", 1e-5)
+    # os.replace cannot overwrite a non-empty directory
+    path.mkdir()
+    (path / "keep").touch()
+
+    assert not write_cached(path, FEATURE)
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_unwritable_cache_dir_still_returns_feature(tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.touch()
+    path = cache_path(blocker / "cache", "Bengaluru, India", 1e-5)
+
+    assert load_or_fetch(path, lambda: FEATURE) == FEATURE
@@ -0,0 +1,136 @@
+import math
+
+from shapely.geometry import MultiPolygon, Polygon, box, mapping
+
+from geometry_utils import clean_polygon, is_unchanged, restore_detail, snap_to_grid
+
+
+def _wiggly_ring(n=400, cx=77.5946123, cy=12.9715987):
+    # Many small zig-zags that simplify() drops, 7-digit coordinates like OSM
+    return [
+        (
+            cx + (0.1 + 0.0005 * (i % 2)) * math.cos(2 * math.pi * i / n),
+            cy + (0.1 + 0.0005 * (i % 2)) * math.sin(2 * math.pi * i / n),
+        )
+        for i in range(n)
+    ]
+
+
+def _leaflet(geom):
+    # What st_folium sends back: toGeoJSON rounds to 6 digits
+    def ring(r):
+        return [(round(x, 6), round(y, 6)) for x, y in r.coords]
+
+    def poly(p):
+        return Polygon(ring(p.exterior), [ring(i) for i in p.interiors])
+
+    if geom.geom_type == "MultiPolygon":
+        return MultiPolygon([poly(p) for p in geom.geoms])
+    return poly(geom)
+
+
+def test_untouched_boundary_restores_full_detail():
+    full = Polygon(_wiggly_ring())
+    display = full.simplify(0.001, preserve_topology=True)
+    assert len(display.exterior.coords) < len(full.exterior.coords)
+
+    restored = restore_detail(_leaflet(display), display, full)
+
+    assert restored.normalize().equals_exact(full.normalize(), 0)
+
+
+def test_moved_vertex_is_kept_and_other_segments_restored():
+    full = Polygon(_wiggly_ring())
+    display = full.simplify(0.001, preserve_topology=True)
+    coords = list(_leaflet(display).exterior.coords)
+    moved = (coords[3][0] + 0.01, coords[3][1] + 0.01)
+    coords[3] = moved
+    edited = Polygon(coords)
+
+    restored = restore_detail(edited, display, full)
+
+    out = list(restored.exterior.coords)
+    assert moved in out
+    # Only the two segments next to the moved vertex lose their detail
+    assert len(display.exterior.coords) < len(out) < len(full.exterior.coords)
+
+
+def test_multipolygon_with_hole():
+    cx, cy = 77.5946123, 12.9715987
+    hole = [(cx + (x - cx) / 4, cy + (y - cy) / 4) for x, y in _wiggly_ring(200)[::-1]]
+    full = MultiPolygon([
+        Polygon(_wiggly_ring(), [hole]),
+        Polygon(_wiggly_ring(cx=78.5, cy=13.5)),
+    ])
+    display = full.simplify(0.0002, preserve_topology=True)
+
+    restored = restore_detail(_leaflet(display), display, full)
+
+    assert restored.normalize().equals_exact(full.normalize(), 0)
+
+
+def test_mismatched_structure_returns_edit_unchanged():
+    full = Polygon(_wiggly_ring())
+    display = full.simplify(0.001, preserve_topology=True)
+    edited = MultiPolygon([_leaflet(display), Polygon([(0, 0), (1, 0), (1, 1)])])
+
+    assert restore_detail(edited, display, full) is edited
+
+
+def test_rounded_echo_of_seven_digit_boundary_is_unchanged():
+    display = Polygon([(77.5946123, 12.9715987), (77.6946129, 12.9715987), (77.6446121, 13.0715983)])
+
+    assert is_unchanged(mapping(_leaflet(display)), display)
+
+
+def test_moved_vertex_is_not_unchanged():
+    display = Polygon([(77.5946123, 12.9715987), (77.6946129, 12.9715987), (77.6446121, 13.0715983)])
+    moved = Polygon([(77.5946123, 12.9715987), (77.6946129, 12.9715987), (77.6446121, 13.0716)])
+
+    assert not is_unchanged(mapping(_leaflet(moved)), display)
+
+
+def test_clean_polygon_keeps_valid_input():
+    square = box(0, 0, 1, 1)
+
+    assert clean_polygon(square) is square
+
+
+def test_clean_polygon_repairs_bow_tie():
+    bow_tie = Polygon([(0, 0), (2, 2), (2, 0), (0, 2)])
+
+    cleaned = clean_polygon(bow_tie)
+
+    assert cleaned.is_valid
+    assert cleaned.area == 2
+
+
+def test_clean_polygon_unions_overlapping_parts():
+    # Lobe dragged over its neighbour: keep the union, don't cut the overlap out
+    overlapping = MultiPolygon([box(0, 0, 2, 2), box(1, 1, 3, 3)])
+
+    cleaned = clean_polygon(overlapping)
+
+    assert cleaned.is_valid
+    assert cleaned.area == 7
+
+
+def test_clean_polygon_returns_none_for_collapsed_edit():
+    collapsed = Polygon([(0, 0), (1, 1), (2, 2), (0, 0)])
+
+    assert clean_polygon(collapsed) is None
+
+
+def test_snap_to_grid_rounds_coordinates():
+    snapped = snap_to_grid(Polygon([(0.1234567, 0), (1, 0), (1, 1.7654321)]), 1e-5)
+
+    assert set(snapped.exterior.coords) == {(0.12346, 0), (1, 0), (1, 1.76543)}
+
+
+def test_snap_to_grid_repairs_invalid_input_instead_of_raising():
+    bow_tie = Polygon([(0, 0), (2, 2), (2, 0), (0, 2)])
+
+    snapped = snap_to_grid(bow_tie, 1e-5)
+
+    assert snapped.is_valid
+    assert snapped.area == 2